@@ -2,7 +2,7 @@ use std::path::PathBuf;
 use criterion::{black_box, criterion_group, criterion_main, Criterion, BenchmarkId};
 use mission_scanner::{
     scan_mission,
-    types::{MissionScannerConfig, DEFAULT_FILE_EXTENSIONS, ReferenceType, MissionResults},
+    types::{MissionScannerConfig, DEFAULT_FILE_EXTENSIONS, DEFAULT_MAX_FILE_SIZE, ReferenceType, MissionResults},
 };
 use tokio::runtime::Runtime;
 
@@ -50,6 +50,8 @@ fn mission_scan_benchmark(c: &mut Criterion) {
     let config = MissionScannerConfig {
         max_threads: num_cpus::get(),
         file_extensions: DEFAULT_FILE_EXTENSIONS.iter().map(|&s| s.to_string()).collect(),
+        cache_dir: None,
+        max_file_size: DEFAULT_MAX_FILE_SIZE,
     };
 
     let mut group = c.benchmark_group("mission_scanner");
@@ -0,0 +1,69 @@
+use std::io::{self, BufWriter, Write};
+use std::path::PathBuf;
+use anyhow::{bail, Context, Result};
+use mission_scanner::{
+    scan_mission_streaming,
+    MissionResults,
+    MissionScannerConfig,
+};
+
+const USAGE: &str = "Usage: export_json [--jsonl] [--cache-dir <dir>] <mission_dir>";
+
+fn main() -> Result<()> {
+    // Initialize logging (goes to stderr, so it never mixes with the JSON on stdout)
+    env_logger::init();
+
+    let mut jsonl = false;
+    let mut mission_dir = None;
+    let mut config = MissionScannerConfig::default();
+    let mut args = std::env::args().skip(1);
+    while let Some(arg) = args.next() {
+        match arg.as_str() {
+            "--jsonl" => jsonl = true,
+            "--cache-dir" => {
+                let dir = args.next().context(USAGE)?;
+                config.cache_dir = Some(PathBuf::from(dir));
+            }
+            flag if flag.starts_with("--") => bail!("Unknown option: {}\n{}", flag, USAGE),
+            _ if mission_dir.is_some() => bail!("Only one mission directory can be exported\n{}", USAGE),
+            _ => mission_dir = Some(PathBuf::from(arg)),
+        }
+    }
+    let mission_dir = mission_dir.context(USAGE)?;
+
+    let stdout = io::stdout();
+    let mut out = BufWriter::new(stdout.lock());
+
+    if jsonl {
+        // Write one reference per line as soon as its file has been parsed. A write
+        // error, e.g. a closed pipe, stops the scan instead of parsing the rest
+        scan_mission_streaming(&mission_dir, config.max_threads, &config, |_, references| {
+            for reference in &references {
+                serde_json::to_writer(&mut out, reference)?;
+                out.write_all(b"\n")?;
+            }
+            Ok(())
+        })?;
+    } else {
+        // Collect the whole mission, then serialize straight into stdout without
+        // building the JSON string in memory
+        let mut class_dependencies = Vec::new();
+        let files = scan_mission_streaming(&mission_dir, config.max_threads, &config, |_, mut references| {
+            class_dependencies.append(&mut references);
+            Ok(())
+        })?;
+        let result = MissionResults {
+            mission_name: files.mission_name,
+            mission_dir: files.mission_dir,
+            sqm_file: files.sqm_file,
+            sqf_files: files.sqf_files,
+            cpp_files: files.cpp_files,
+            class_dependencies,
+        };
+        serde_json::to_writer_pretty(&mut out, &result)?;
+        out.write_all(b"\n")?;
+    }
+
+    out.flush()?;
+    Ok(())
+}
@@ -47,8 +47,10 @@ pub struct HppParser {
 /// 
 /// * `Result<Vec<HppClass>, Codes>` - List of classes found in the file or error
 pub fn parse_file(file_path: &std::path::Path) -> Result<Vec<HppClass>, Codes> {
-    let content = std::fs::read_to_string(file_path)
+    let bytes = std::fs::read(file_path)
         .map_err(|_| vec![])?;
+    // Config files are often saved as Windows-1252, so don't reject non-UTF-8 input
+    let content = String::from_utf8_lossy(&bytes);
     
     let parser = HppParser::new(&content)?;
     Ok(parser.parse_classes())
@@ -91,39 +93,41 @@ impl HppParser {
 
     pub fn parse_classes(&self) -> Vec<HppClass> {
         let mut classes = Vec::new();
-        self.extract_classes(&self.config, &mut classes);
+        self.extract_classes(&self.config.0, &mut classes);
         classes
     }
 
-    fn extract_classes(&self, config: &Config, classes: &mut Vec<HppClass>) {
-        for property in config.0.iter() {
+    fn extract_classes(&self, properties: &[Property], classes: &mut Vec<HppClass>) {
+        for property in properties {
             if let Property::Class(class) = property {
                 if let Class::Local { name, parent, properties, .. } = class {
                     let mut hpp_class = HppClass {
                         name: name.as_str().to_string(),
                         parent: parent.as_ref().map(|p| p.as_str().to_string()),
-                        properties: Vec::new(),
+                        properties: Vec::with_capacity(properties.len()),
                     };
 
-                    // Extract properties from the class
+                    // Extract properties from the class, noting whether it has nested classes
+                    let mut has_nested_classes = false;
                     for prop in properties {
-                        if let Property::Entry { name, value, .. } = prop {
-                            hpp_class.properties.push(HppProperty {
-                                name: name.as_str().to_string(),
-                                value: self.convert_value(value),
-                            });
+                        match prop {
+                            Property::Entry { name, value, .. } => {
+                                hpp_class.properties.push(HppProperty {
+                                    name: name.as_str().to_string(),
+                                    value: self.convert_value(value),
+                                });
+                            }
+                            Property::Class(_) => has_nested_classes = true,
+                            _ => {}
                         }
                     }
 
                     classes.push(hpp_class);
 
-                    for prop in properties {
-                        if let Property::Class(_) = prop {
-                            let mut nested_classes = Vec::new();
-                            let nested_config = Config(vec![prop.clone()]);
-                            self.extract_classes(&nested_config, &mut nested_classes);
-                            classes.extend(nested_classes);
-                        }
+                    // Loadout classes are almost always flat; only walk the body a second
+                    // time, in place rather than cloning each subtree, when it nests classes
+                    if has_nested_classes {
+                        self.extract_classes(properties, classes);
                     }
                 }
             }
@@ -218,6 +222,28 @@ mod tests {
         assert_eq!(classes[1].parent.as_deref(), Some("BaseMan"));
     }
 
+    #[test]
+    fn test_nested_classes() {
+        let content = r#"
+            class Outer {
+                class Middle {
+                    class Inner {
+                        name = "inner";
+                    };
+                };
+                class Sibling {
+                    name = "sibling";
+                };
+            };
+        "#;
+
+        let parser = HppParser::new(content).unwrap();
+        let classes = parser.parse_classes();
+
+        let names: Vec<_> = classes.iter().map(|c| c.name.as_str()).collect();
+        assert_eq!(names, vec!["Outer", "Middle", "Inner", "Sibling"]);
+    }
+
     #[test]
     fn test_array_with_list_macro() {
         let content = r#"
@@ -1,7 +1,8 @@
 use hemtt_sqf::{Expression, Statement, Statements, BinaryCommand, UnaryCommand};
 use crate::models::{ClassReference, UsageContext, AnalysisResult};
 use std::collections::{HashMap, HashSet};
-use std::sync::{Arc, Mutex};
+use std::io::Read;
+use std::sync::{Arc, Mutex, OnceLock};
 use super::array_handler::ArrayHandler;
 
 /// Represents a value in SQF execution
@@ -27,25 +28,37 @@ pub struct Evaluator {
     array_handler: ArrayHandler,
 }
 
+/// Functions known to take class references
+const CLASS_REFERENCE_FUNCTIONS: &[&str] = &["ace_arsenal_fnc_initBox"];
+
+/// Commands that take class references
+const CLASS_REFERENCE_COMMANDS: &[&str] = &[
+    "addWeapon", "addWeaponCargo", "addWeaponGlobal", "addWeaponCargoGlobal",
+    "addMagazine", "addMagazineCargo", "addMagazineGlobal", "addMagazineCargoGlobal",
+    "addItem", "addItemCargo", "addItemToBackpack", "addItemToUniform", "addItemToVest",
+    "addBackpack", "addBackpackCargo", "addBackpackGlobal", "addBackpackCargoGlobal",
+    "addGoggles", "addHeadgear", "forceAddUniform", "addVest", "addUniform",
+    "linkItem",
+];
+
+/// Upper bound on the length of the function and command names above
+const MAX_FUNCTION_NAME_LEN: usize = 32;
+
+/// Lowercased set of all class reference functions and commands, built once per process
+fn class_reference_functions() -> &'static HashSet<String> {
+    static FUNCTIONS: OnceLock<HashSet<String>> = OnceLock::new();
+    FUNCTIONS.get_or_init(|| {
+        CLASS_REFERENCE_FUNCTIONS.iter()
+            .chain(CLASS_REFERENCE_COMMANDS)
+            .map(|name| name.to_lowercase())
+            .collect()
+    })
+}
+
 impl Default for Evaluator {
     fn default() -> Self {
         // Initialize with known functions that indicate class references
-        let mut class_reference_functions = HashSet::new();
-        
-        // Add functions
-        class_reference_functions.insert("ace_arsenal_fnc_initbox".to_string());
-        
-        // Add commands that take class references
-        for cmd in &[
-            "addWeapon", "addWeaponCargo", "addWeaponGlobal", "addWeaponCargoGlobal",
-            "addMagazine", "addMagazineCargo", "addMagazineGlobal", "addMagazineCargoGlobal",
-            "addItem", "addItemCargo", "addItemToBackpack", "addItemToUniform", "addItemToVest",
-            "addBackpack", "addBackpackCargo", "addBackpackGlobal", "addBackpackCargoGlobal",
-            "addGoggles", "addHeadgear", "forceAddUniform", "addVest", "addUniform",
-            "linkItem",
-        ] {
-            class_reference_functions.insert(cmd.to_string().to_lowercase());
-        }
+        let class_reference_functions = class_reference_functions().clone();
 
         // Create a new evaluator with a reference callback
         let references = Arc::new(Mutex::new(HashMap::new()));
@@ -281,33 +294,48 @@ impl Evaluator {
     }
 
     /// Quick check if content contains any class reference functions
-    /// Uses a buffered reader to efficiently scan large files
-    pub fn should_evaluate<R: std::io::BufRead>(reader: R) -> bool {
-        // Create default evaluator to get the function set
-        let evaluator = Self::default();
-        let functions = evaluator.get_class_reference_functions();
-        
-        // Convert all functions to lowercase once
-        let functions_lower: HashSet<String> = functions.iter()
-            .map(|f| f.to_lowercase())
-            .collect();
+    /// Reads the whole input once and scans it as a single buffer
+    pub fn should_evaluate<R: std::io::BufRead>(mut reader: R) -> bool {
+        let mut content = Vec::new();
+        match reader.read_to_end(&mut content) {
+            Ok(_) => Self::should_evaluate_content(&String::from_utf8_lossy(&content)),
+            Err(_) => false
+        }
+    }
+
+    /// Quick check if already loaded content contains any class reference functions
+    ///
+    /// Walks the bytes once, comparing each identifier token case-insensitively against
+    /// the known functions in a small stack buffer instead of lowercasing the whole file.
+    /// Only whole identifiers match, the same way the evaluator recognises commands.
+    pub fn should_evaluate_content(content: &str) -> bool {
+        let functions = class_reference_functions();
+        let bytes = content.as_bytes();
+        let mut token_lower = [0u8; MAX_FUNCTION_NAME_LEN];
+        
+        let mut pos = 0;
+        while pos < bytes.len() {
+            if !is_identifier_byte(bytes[pos]) {
+                pos += 1;
+                continue;
+            }
             
-        // Buffer for the current line
-        let mut line_buffer = String::new();
-        
-        // Read the file line by line
-        for line in reader.lines() {
-            match line {
-                Ok(line) => {
-                    line_buffer.clear();
-                    line_buffer.push_str(&line.to_lowercase());
-                    
-                    // Check if any function exists in this line
-                    if functions_lower.iter().any(|func| line_buffer.contains(func)) {
-                        return true;
-                    }
-                }
-                Err(_) => break
+            let start = pos;
+            while pos < bytes.len() && is_identifier_byte(bytes[pos]) {
+                pos += 1;
+            }
+            
+            // Tokens longer than any known function can never match
+            let token = &bytes[start..pos];
+            if token.len() > MAX_FUNCTION_NAME_LEN {
+                continue;
+            }
+            
+            let lower = &mut token_lower[..token.len()];
+            lower.copy_from_slice(token);
+            lower.make_ascii_lowercase();
+            if std::str::from_utf8(lower).map_or(false, |name| functions.contains(name)) {
+                return true;
             }
         }
         
@@ -315,6 +343,11 @@ impl Evaluator {
     }
 }
 
+/// Check if a byte can be part of an SQF identifier
+fn is_identifier_byte(byte: u8) -> bool {
+    byte.is_ascii_alphanumeric() || byte == b'_'
+}
+
 /// Evaluate an SQF script to extract all class references
 pub fn evaluate_sqf(statements: &Statements) -> Result<AnalysisResult, String> {
     let mut evaluator = Evaluator::default();
@@ -620,6 +653,30 @@ mod tests {
         assert!(!Evaluator::should_evaluate(std::io::BufReader::new(content_without_match.as_bytes())));
     }
 
+    #[test]
+    fn test_should_evaluate_content() {
+        let content = "private _unit = player;\n\n_unit ADDWEAPON \"rhs_weap_m4a1\";\n";
+        assert!(Evaluator::should_evaluate_content(content));
+        
+        assert!(!Evaluator::should_evaluate_content("player setPos [0, 0, 0];\nhint \"nothing\";\n"));
+        assert!(!Evaluator::should_evaluate_content(""));
+        
+        // Only whole identifiers count, not names that merely contain a command
+        assert!(!Evaluator::should_evaluate_content("my_addWeaponHelper = 1;"));
+    }
+
+    #[test]
+    fn test_function_names_fit_scan_buffer() {
+        assert!(class_reference_functions().iter().all(|f| f.len() <= MAX_FUNCTION_NAME_LEN));
+    }
+
+    #[test]
+    fn test_should_evaluate_non_utf8() {
+        // Windows-1252 comment before the command must not stop the scan
+        let content = b"// Ausr\xfcstung\nplayer addWeapon \"rhs_weap_m4a1\";";
+        assert!(Evaluator::should_evaluate(std::io::BufReader::new(&content[..])));
+    }
+
     #[test]
     fn test_mixed_case_commands() {
         let code = r#"
@@ -56,17 +56,15 @@ impl From<SqfError> for Error {
 /// # Returns
 /// * `Result<Vec<ClassReference>, Error>` - List of found class references or error
 pub fn parse_file(file_path: &Path) -> Result<Vec<ClassReference>, Error> {
-    // First do a quick scan with buffered reading
-    let file = fs::File::open(file_path)?;
-    let reader = std::io::BufReader::new(file);
+    // Read the file once and reuse the buffer for both the quick scan and full parsing.
+    // Scripts are often saved as Windows-1252, so don't reject non-UTF-8 input.
+    let bytes = fs::read(file_path)?;
+    let content = String::from_utf8_lossy(&bytes);
     
-    if !evaluator::Evaluator::should_evaluate(reader) {
+    if !evaluator::Evaluator::should_evaluate_content(&content) {
         return Ok(Vec::new());
     }
     
-    // If we found a match, now read the whole file for full parsing
-    let content = fs::read_to_string(file_path)?;
-    
     // Create a workspace path for the file
     let workspace_path = WorkspacePath::slim_file(file_path)?;
     
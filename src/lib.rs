@@ -4,6 +4,8 @@ pub mod types;
 pub use types::{
     ClassReference,
     ClassSource,
+    FileKind,
+    MissionFileResults,
     MissionResults,
     MissionScannerConfig,
     ReferenceType,
@@ -11,5 +13,10 @@ pub use types::{
 
 pub use scanner::{
     parse_file,
+    parse_file_as,
+    parse_file_cached,
+    scan_files,
     scan_mission,
+    scan_mission_streaming,
+    ParseCache,
 };
\ No newline at end of file
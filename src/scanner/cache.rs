@@ -0,0 +1,92 @@
+use std::fs;
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+use anyhow::Result;
+use log::warn;
+use sha2::{Digest, Sha256};
+
+use crate::types::ClassReference;
+
+/// Version of the parse results stored in the cache, part of every key.
+/// Bump this whenever a parser change alters the references produced for a file,
+/// so entries written by older parsers are no longer served.
+const CACHE_FORMAT_VERSION: u32 = 1;
+
+/// Package version, also part of every key. Parse results depend on sqf-analyzer and
+/// HEMTT, so any release, including dependency upgrades, starts from a fresh cache
+/// even if `CACHE_FORMAT_VERSION` was not bumped.
+const PACKAGE_VERSION: &str = env!("CARGO_PKG_VERSION");
+
+/// Distinguishes temporary files written concurrently by one process
+static TEMP_FILE_COUNTER: AtomicUsize = AtomicUsize::new(0);
+
+/// Persistent on-disk cache of parse results keyed by file content.
+///
+/// Entries are stored as JSON at `<root>/<key[..2]>/<key[2..]>.json`. Keys are a
+/// SHA-256 of the cache format and package versions, the file path and its bytes,
+/// so an edited file or an updated parser simply misses the cache and no explicit
+/// invalidation is needed.
+#[derive(Debug, Clone)]
+pub struct ParseCache {
+    root: PathBuf,
+}
+
+impl ParseCache {
+    /// Create a cache rooted at the given directory
+    pub fn new(root: impl Into<PathBuf>) -> Self {
+        Self { root: root.into() }
+    }
+
+    /// Compute the cache key for a file from its path and content
+    ///
+    /// The path is part of the key because class references record their source file.
+    pub(crate) fn key(file_path: &Path, content: &[u8]) -> String {
+        let mut hasher = Sha256::new();
+        hasher.update(CACHE_FORMAT_VERSION.to_le_bytes());
+        hasher.update(PACKAGE_VERSION.as_bytes());
+        hasher.update([0u8]);
+        hasher.update(file_path.to_string_lossy().as_bytes());
+        hasher.update([0u8]);
+        hasher.update(content);
+        format!("{:x}", hasher.finalize())
+    }
+
+    /// Look up cached class references for a key from [`ParseCache::key`]
+    pub(crate) fn get(&self, key: &str) -> Option<Vec<ClassReference>> {
+        let data = fs::read(self.entry_path(key)).ok()?;
+        match serde_json::from_slice(&data) {
+            Ok(references) => Some(references),
+            Err(e) => {
+                warn!("Ignoring corrupt cache entry {}: {}", key, e);
+                None
+            }
+        }
+    }
+
+    /// Store class references for a key from [`ParseCache::key`]
+    pub(crate) fn put(&self, key: &str, references: &[ClassReference]) -> Result<()> {
+        let entry_path = self.entry_path(key);
+        if let Some(parent) = entry_path.parent() {
+            fs::create_dir_all(parent)?;
+        }
+        
+        // Write to a temporary file first so readers never see a partial entry. The name
+        // is unique per write, as several threads may store the same entry at once
+        let temp_path = entry_path.with_extension(format!(
+            "{}.{}.tmp",
+            std::process::id(),
+            TEMP_FILE_COUNTER.fetch_add(1, Ordering::Relaxed)
+        ));
+        fs::write(&temp_path, serde_json::to_vec(references)?)?;
+        fs::rename(&temp_path, &entry_path)?;
+        Ok(())
+    }
+
+    /// Path of the cache entry for a key. Keys are 64 hex digits, so splitting off
+    /// the first two is always in bounds and on a character boundary
+    fn entry_path(&self, key: &str) -> PathBuf {
+        let (prefix, rest) = key.split_at(2);
+        self.root.join(prefix).join(format!("{}.json", rest))
+    }
+}
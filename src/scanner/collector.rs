@@ -1,14 +1,47 @@
 use std::collections::HashSet;
+use std::fs::File;
+use std::io::Read;
 use std::path::{Path, PathBuf};
 
 use anyhow::{Result, anyhow};
-use walkdir::WalkDir;
+use log::debug;
+use walkdir::{DirEntry, WalkDir};
 
-use crate::types::MissionFileResults;
+use crate::types::{FileKind, MissionFileResults, DEFAULT_MAX_FILE_SIZE};
 
-/// Check if a path is a mission directory
-fn is_mission_directory(path: &Path) -> bool {
-    path.is_dir() && path.join("mission.sqm").exists()
+/// Number of leading bytes inspected when sniffing for binary content
+const BINARY_SNIFF_LEN: usize = 4096;
+
+/// Check if a directory entry is a mission directory
+fn is_mission_directory(entry: &DirEntry) -> bool {
+    entry.file_type().is_dir() && entry.path().join("mission.sqm").exists()
+}
+
+/// Check whether a file is small enough, and textual enough, to be worth parsing
+fn is_parseable_file(path: &Path, len: u64, max_file_size: u64) -> bool {
+    if len > max_file_size {
+        debug!("Skipping oversized file ({} bytes): {}", len, path.display());
+        return false;
+    }
+    
+    // Binarized files of any size are caught here, such as a rapified mission.sqm,
+    // which starts with "\0raP" and would otherwise be decoded lossily and parsed
+    if looks_binary(path) {
+        debug!("Skipping binary file: {}", path.display());
+        return false;
+    }
+    
+    true
+}
+
+/// Check the start of a file for NUL bytes, which never appear in mission text files
+fn looks_binary(path: &Path) -> bool {
+    let mut buffer = [0u8; BINARY_SNIFF_LEN];
+    match File::open(path).and_then(|mut file| file.read(&mut buffer)) {
+        Ok(read) => buffer[..read].contains(&0),
+        // Leave read errors for the parser to report
+        Err(_) => false,
+    }
 }
 
 /// Find mission.sqm in a directory
@@ -21,45 +54,75 @@ pub fn find_mission_file(dir: &Path) -> Result<Option<PathBuf>> {
     }
 }
 
+/// Find a mission.sqm worth parsing in a directory
+///
+/// Existence, size and type all come from a single stat, instead of one for the
+/// existence check and another for the size check.
+pub(crate) fn find_parseable_mission_file(dir: &Path, max_file_size: u64) -> Option<PathBuf> {
+    let sqm_path = dir.join("mission.sqm");
+    let metadata = std::fs::metadata(&sqm_path).ok()?;
+    (metadata.is_file() && is_parseable_file(&sqm_path, metadata.len(), max_file_size))
+        .then_some(sqm_path)
+}
+
 /// Find all SQF files in a directory
+///
+/// Same file set as the first list of [`find_source_files`], with the default size limit.
 pub fn find_script_files(dir: &Path, allowed_extensions: &[String]) -> Result<Vec<PathBuf>> {
-    if !allowed_extensions.contains(&"sqf".to_string()) {
-        return Ok(Vec::new());
-    }
-
-    let mut sqf_files = Vec::new();
-    for entry in WalkDir::new(dir).into_iter().filter_map(|e| e.ok()) {
-        let path = entry.path();
-        if path.is_file() && path.extension().map_or(false, |ext| ext == "sqf") {
-            sqf_files.push(path.to_path_buf());
-        }
-    }
+    let (sqf_files, _) = find_source_files(dir, allowed_extensions, DEFAULT_MAX_FILE_SIZE)?;
     Ok(sqf_files)
 }
 
-/// Find all CPP/HPP files in a directory
+/// Find all CPP/HPP/EXT files in a directory
+///
+/// Same file set as the second list of [`find_source_files`], with the default size limit.
 pub fn find_code_files(dir: &Path, allowed_extensions: &[String]) -> Result<Vec<PathBuf>> {
-    // Check if any code file extensions are allowed
-    let has_code_extensions = allowed_extensions.iter().any(|ext| 
-        ext == "cpp" || ext == "hpp" || ext == "ext"
-    );
-    if !has_code_extensions {
-        return Ok(Vec::new());
-    }
+    let (_, code_files) = find_source_files(dir, allowed_extensions, DEFAULT_MAX_FILE_SIZE)?;
+    Ok(code_files)
+}
 
-    let mut cpp_files = Vec::new();
+/// Find all SQF and CPP/HPP files in a directory with a single walk
+///
+/// Returns `(sqf_files, code_files)`. Only extensions listed in `allowed_extensions`
+/// are collected, and file types come from the cached directory entry so only
+/// candidate files are stat'ed. Candidates larger than `max_file_size` or that look
+/// binary are skipped without being parsed.
+pub fn find_source_files(
+    dir: &Path,
+    allowed_extensions: &[String],
+    max_file_size: u64
+) -> Result<(Vec<PathBuf>, Vec<PathBuf>)> {
+    let is_allowed = |ext: &str| allowed_extensions.iter().any(|allowed| allowed.eq_ignore_ascii_case(ext));
+    
+    let mut sqf_files = Vec::new();
+    let mut code_files = Vec::new();
     for entry in WalkDir::new(dir).into_iter().filter_map(|e| e.ok()) {
-        let path = entry.path();
-        if path.is_file() {
-            if let Some(ext) = path.extension() {
-                let ext = ext.to_string_lossy().to_lowercase();
-                if allowed_extensions.contains(&ext.to_string()) {
-                    cpp_files.push(path.to_path_buf());
-                }
-            }
+        if !entry.file_type().is_file() {
+            continue;
+        }
+        
+        let Some(ext) = entry.path().extension().and_then(|ext| ext.to_str()) else {
+            continue;
+        };
+        
+        // Classify once here so parsing doesn't have to look at the extension again
+        let kind = match FileKind::from_extension(ext) {
+            Some(kind @ (FileKind::Sqf | FileKind::Code)) if is_allowed(ext) => kind,
+            _ => continue,
+        };
+        
+        // Size check happens only for candidates, using a single stat per file
+        let len = entry.metadata().map(|metadata| metadata.len()).unwrap_or(0);
+        if !is_parseable_file(entry.path(), len, max_file_size) {
+            continue;
+        }
+        
+        match kind {
+            FileKind::Sqf => sqf_files.push(entry.into_path()),
+            _ => code_files.push(entry.into_path()),
         }
     }
-    Ok(cpp_files)
+    Ok((sqf_files, code_files))
 }
 
 /// Collect mission files from a directory with configuration
@@ -72,12 +135,11 @@ pub fn collect_mission_files(dir: &Path) -> Result<Vec<MissionFileResults>> {
     let mut seen_missions = HashSet::new();
     
     for entry in walker.into_iter().filter_map(|e| e.ok()) {
-        let path = entry.path();
-        
         // Skip non-mission directories
-        if !is_mission_directory(path) {
+        if !is_mission_directory(&entry) {
             continue;
         }
+        let path = entry.path();
         
         // Get mission name from directory name
         let mission_name = path.file_name()
@@ -90,14 +152,15 @@ pub fn collect_mission_files(dir: &Path) -> Result<Vec<MissionFileResults>> {
             continue;
         }
         
-        // Find mission.sqm
-        let mission_file = find_mission_file(path)?;
-        
-        // Find SQF files
-        let script_files = find_script_files(path, &["sqf".to_string()])?;
+        // is_mission_directory already found mission.sqm, no need to look again
+        let mission_file = Some(path.join("mission.sqm"));
         
-        // Find CPP/HPP files
-        let code_files = find_code_files(path, &["cpp".to_string(), "hpp".to_string(), "ext".to_string()])?;
+        // Find SQF and CPP/HPP files
+        let (script_files, code_files) = find_source_files(
+            path,
+            &["sqf".to_string(), "cpp".to_string(), "hpp".to_string(), "ext".to_string()],
+            DEFAULT_MAX_FILE_SIZE
+        )?;
         
         results.push(MissionFileResults {
             mission_name,
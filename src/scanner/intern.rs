@@ -0,0 +1,40 @@
+use std::collections::HashSet;
+use std::sync::Arc;
+
+use crate::types::ClassReference;
+
+/// Canonicalizes class names so every reference to the same class shares one allocation.
+///
+/// Missions reference the same handful of items from hundreds of files, so the number
+/// of unique names is far smaller than the number of references.
+#[derive(Debug, Default)]
+pub(crate) struct ClassNameInterner {
+    names: HashSet<Arc<str>>,
+}
+
+impl ClassNameInterner {
+    pub(crate) fn new() -> Self {
+        Self::default()
+    }
+
+    /// Return the shared copy of `name`, storing it if this is its first occurrence
+    pub(crate) fn intern(&mut self, name: &Arc<str>) -> Arc<str> {
+        if let Some(existing) = self.names.get(name) {
+            return Arc::clone(existing);
+        }
+        self.names.insert(Arc::clone(name));
+        Arc::clone(name)
+    }
+
+    /// Replace the class names of `references` with their shared copies
+    pub(crate) fn intern_references(&mut self, references: &mut [ClassReference]) {
+        for reference in references {
+            reference.class_name = self.intern(&reference.class_name);
+        }
+    }
+
+    /// Number of unique class names seen so far
+    pub(crate) fn len(&self) -> usize {
+        self.names.len()
+    }
+}
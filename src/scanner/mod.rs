@@ -1,7 +1,11 @@
+mod cache;
 mod collector;
+mod intern;
 mod parser;
 mod scanner;
+mod source;
 
-pub use collector::{collect_mission_files, find_mission_file, find_script_files, find_code_files};
-pub use parser::parse_file;
-pub use scanner::scan_mission;
\ No newline at end of file
+pub use collector::{collect_mission_files, find_mission_file, find_script_files, find_code_files, find_source_files};
+pub use cache::ParseCache;
+pub use parser::{parse_file, parse_file_as, parse_file_cached};
+pub use scanner::{scan_files, scan_mission, scan_mission_streaming};
\ No newline at end of file
@@ -1,16 +1,55 @@
 // Std imports
-use std::fs;
+use std::collections::HashSet;
 use std::path::Path;
+use std::sync::OnceLock;
 
 // External crate imports
+use aho_corasick::AhoCorasick;
 use anyhow::{Result, anyhow};
 use log::{debug, warn};
-use parser_hpp::{parse_file as parser_hpp_file, HppValue};
+use parser_hpp::{HppParser, HppValue};
 use sqf_analyzer::{Args, analyze_sqf};
 use parser_sqm::extract_class_dependencies;
 
 // Internal crate imports
-use crate::types::{ClassReference, ReferenceType};
+use crate::types::{ClassReference, FileKind, ReferenceType};
+use super::cache::ParseCache;
+use super::source::SourceFile;
+
+/// Known equipment property names in loadout files, used for both `name = ...`
+/// string properties and `name[] = {...}` array properties
+const EQUIPMENT_PROPERTIES: &[&str] = &[
+    "uniform", "vest", "backpack", "headgear", "goggles", "hmd",
+    "primaryweapon", "secondaryweapon", "handgunweapon", "sidearmweapon",
+    "scope", "bipod", "attachment", "silencer", "magazines", "items", "linkeditems",
+];
+
+/// Functions passed to sqf-analyzer to find direct equipment references
+const SQF_EQUIPMENT_FUNCTIONS: &str = "addItemToUniform,addItemToVest,addItemToBackpack,addItem,addWeapon,addWeaponItem,addMagazine,addMagazineCargo,addWeaponCargo,addItemCargo,forceAddUniform,addVest,addHeadgear,addGoggles,addBackpack,ace_arsenal_fnc_initBox";
+
+/// Case-insensitive matcher for all SQF equipment functions, built once per process.
+/// Finds any of them in a single linear pass over a file.
+fn sqf_equipment_matcher() -> &'static AhoCorasick {
+    static MATCHER: OnceLock<AhoCorasick> = OnceLock::new();
+    MATCHER.get_or_init(|| {
+        AhoCorasick::builder()
+            .ascii_case_insensitive(true)
+            .build(SQF_EQUIPMENT_FUNCTIONS.split(','))
+            .expect("SQF equipment function names are valid patterns")
+    })
+}
+
+/// Case-insensitive matcher for the `class` keyword, built once per process.
+/// Every dependency in a config file comes from a class definition.
+fn class_keyword_matcher() -> &'static AhoCorasick {
+    static MATCHER: OnceLock<AhoCorasick> = OnceLock::new();
+    MATCHER.get_or_init(|| {
+        AhoCorasick::builder()
+            .ascii_case_insensitive(true)
+            .build(["class"])
+            .expect("class keyword is a valid pattern")
+    })
+}
 
 /// Parse any supported file type and extract class dependencies.
 /// 
@@ -35,17 +74,28 @@ use crate::types::{ClassReference, ReferenceType};
 pub fn parse_file(file_path: &Path) -> Result<Vec<ClassReference>> {
     let extension = file_path.extension()
         .and_then(|ext| ext.to_str())
-        .ok_or_else(|| anyhow!("File has no extension: {}", file_path.display()))?
-        .to_lowercase();
+        .ok_or_else(|| anyhow!("File has no extension: {}", file_path.display()))?;
+    let kind = FileKind::from_extension(extension)
+        .ok_or_else(|| anyhow!("Unsupported file type: {}", extension))?;
+    
+    parse_source(file_path, kind, None)
+}
 
-    debug!("Starting to parse file: {} (type: {})", file_path.display(), extension);
+/// Parse a file whose kind is already known, e.g. from a directory walk,
+/// skipping extension detection.
+pub fn parse_file_as(file_path: &Path, kind: FileKind) -> Result<Vec<ClassReference>> {
+    parse_source(file_path, kind, None)
+}
 
-    let result = match extension.as_str() {
-        "sqf" => parse_sqf(file_path),
-        "sqm" => parse_sqm(file_path),
-        "cpp" | "hpp" | "ext" => parse_hpp(file_path),
-        _ => Err(anyhow!("Unsupported file type: {}", extension))
-    };
+/// Parse a file, reusing its contents if they have already been loaded
+fn parse_source(file_path: &Path, kind: FileKind, source: Option<SourceFile>) -> Result<Vec<ClassReference>> {
+    debug!("Starting to parse file: {} (type: {:?})", file_path.display(), kind);
+
+    let result = load_source(file_path, source).and_then(|source| match kind {
+        FileKind::Sqf => parse_sqf(file_path, &source),
+        FileKind::Sqm => parse_sqm(file_path, &source),
+        FileKind::Code => parse_hpp(file_path, &source),
+    });
 
     match &result {
         Ok(deps) => debug!("Successfully parsed {} with {} dependencies", file_path.display(), deps.len()),
@@ -62,73 +112,121 @@ pub fn parse_file(file_path: &Path) -> Result<Vec<ClassReference>> {
     result
 }
 
+/// Parse a file like [`parse_file_as`], reusing cached results when its content is unchanged.
+/// 
+/// Only successful parses are cached; failures are returned and retried on the next scan.
+pub fn parse_file_cached(file_path: &Path, kind: FileKind, cache: &ParseCache) -> Result<Vec<ClassReference>> {
+    let source = load_source(file_path, None)?;
+    let key = ParseCache::key(file_path, source.bytes());
+    
+    if let Some(deps) = cache.get(&key) {
+        debug!("Cache hit for {} ({} dependencies)", file_path.display(), deps.len());
+        return Ok(deps);
+    }
+    
+    // Hand the loaded contents to the parser so the file is not read twice
+    let deps = parse_source(file_path, kind, Some(source))?;
+    if let Err(e) = cache.put(&key, &deps) {
+        warn!("Failed to cache results for {}: {}", file_path.display(), e);
+    }
+    Ok(deps)
+}
+
+/// Use already loaded file contents, or load them from disk
+fn load_source(file_path: &Path, source: Option<SourceFile>) -> Result<SourceFile> {
+    match source {
+        Some(source) => Ok(source),
+        None => SourceFile::open(file_path)
+            .map_err(|e| anyhow!("Failed to read file {}: {}", file_path.display(), e)),
+    }
+}
+
 /// Parse a loadout file and extract equipment information
-pub fn parse_hpp(file_path: &Path) -> Result<Vec<ClassReference>> {
+pub fn parse_hpp(file_path: &Path, source: &SourceFile) -> Result<Vec<ClassReference>> {
+    // Settings-only snippets define no classes; skip parsing them entirely
+    if !class_keyword_matcher().is_match(source.bytes()) {
+        debug!("No class definitions in loadout file, skipping: {}", file_path.display());
+        return Ok(Vec::new());
+    }
+    
     debug!("Starting loadout file parse: {}", file_path.display());
     
+    let content = source.text();
+    
     // Parse using parser_hpp
-    let classes = parser_hpp_file(file_path)
+    let classes = HppParser::new(&content)
+        .map(|parser| parser.parse_classes())
         .map_err(|e| anyhow!("Failed to parse loadout file: {:?}", e))?;
     
     debug!("Found {} classes in loadout file", classes.len());
     
     let mut dependencies = Vec::new();
+    let inheritance_context = format!("loadout:class:{}", file_path.display());
+    
+    // Loadouts repeat the same items across many classes; every (context, class name)
+    // pair yields an identical reference, so emit each pair only once
+    let mut seen: HashSet<(&str, &str)> = HashSet::new();
     
     // Convert each class and its items to dependencies
-    for class in classes {
+    for class in &classes {
         debug!("Processing class: {}", class.name);
         
         // Add parent class as inheritance dependency if it exists
-        if let Some(parent) = class.parent {
-            dependencies.push(ClassReference {
-                class_name: parent,
-                reference_type: ReferenceType::Inheritance,
-                context: format!("loadout:class:{}", file_path.display()),
-                source_file: file_path.to_path_buf()
-            });
+        if let Some(parent) = &class.parent {
+            if seen.insert(("class", parent.as_str())) {
+                dependencies.push(ClassReference {
+                    class_name: parent.as_str().into(),
+                    reference_type: ReferenceType::Inheritance,
+                    context: inheritance_context.clone(),
+                    source_file: file_path.to_path_buf()
+                });
+            }
         }
         
         // Add both array properties and string properties
-        for property in class.properties {
+        for property in &class.properties {
+            // Resolve the property name once, before looking at its value
+            let Some(property_name) = equipment_property_name(&property.name) else {
+                continue;
+            };
+            let context = format!("loadout:{}:{}", property_name, file_path.display());
+            
             match &property.value {
                 HppValue::Array(items) => {
                     // Process array properties (uniform[], vest[], etc.)
-                    let property_name = property.name.to_lowercase();
-                    if is_equipment_array(&property_name) {
-                        debug!("Processing equipment array: {}", property_name);
-                        
-                        // Process each array item, stripping any extra quotes
-                        for item in items {
-                            // Skip empty items and preprocessor macros
-                            let clean_item = item.trim().trim_matches('"');
-                            if !clean_item.is_empty() && 
-                               clean_item != "default" && 
-                               !clean_item.starts_with("LIST_") {
-                                dependencies.push(ClassReference {
-                                    class_name: clean_item.to_string(),
-                                    reference_type: ReferenceType::Direct,
-                                    context: format!("loadout:{}:{}", property_name, file_path.display()),
-                                    source_file: file_path.to_path_buf()
-                                });
-                            }
-                        }
-                    }
-                },
-                HppValue::String(value) => {
-                    // Process string properties (uniform=, vest=, etc.)
-                    let property_name = property.name.to_lowercase();
-                    if is_equipment_property(&property_name) {
-                        let clean_item = value.trim().trim_matches('"');
-                        if !clean_item.is_empty() && clean_item != "default" {
+                    debug!("Processing equipment array: {}", property_name);
+                    
+                    // Process each array item, stripping any extra quotes
+                    for item in items {
+                        // Skip empty items and preprocessor macros
+                        let clean_item = item.trim().trim_matches('"');
+                        if !clean_item.is_empty() && 
+                           clean_item != "default" && 
+                           !clean_item.starts_with("LIST_") &&
+                           seen.insert((property_name, clean_item)) {
                             dependencies.push(ClassReference {
-                                class_name: clean_item.to_string(),
+                                class_name: clean_item.into(),
                                 reference_type: ReferenceType::Direct,
-                                context: format!("loadout:{}:{}", property_name, file_path.display()),
+                                context: context.clone(),
                                 source_file: file_path.to_path_buf()
                             });
                         }
                     }
                 },
+                HppValue::String(value) => {
+                    // Process string properties (uniform=, vest=, etc.)
+                    let clean_item = value.trim().trim_matches('"');
+                    if !clean_item.is_empty() && 
+                       clean_item != "default" &&
+                       seen.insert((property_name, clean_item)) {
+                        dependencies.push(ClassReference {
+                            class_name: clean_item.into(),
+                            reference_type: ReferenceType::Direct,
+                            context,
+                            source_file: file_path.to_path_buf()
+                        });
+                    }
+                },
                 _ => {}
             }
         }
@@ -138,45 +236,27 @@ pub fn parse_hpp(file_path: &Path) -> Result<Vec<ClassReference>> {
     Ok(dependencies)
 }
 
-/// Determine if a property name is an equipment array we should process
-fn is_equipment_array(name: &str) -> bool {
-    // List of known equipment array property names in loadout files
-    const EQUIPMENT_ARRAYS: [&str; 17] = [
-        "uniform", "vest", "backpack", "headgear", "goggles", "hmd",
-        "primaryweapon", "secondaryweapon", "handgunweapon", "sidearmweapon",
-        "scope", "bipod", "attachment", "silencer", "magazines", "items", "linkeditems",
-        // Add any other relevant equipment array names here
-    ];
-    
-    EQUIPMENT_ARRAYS.iter().any(|&array_name| name == array_name)
-}
-
-/// Determine if a property name is an equipment property we should process
-fn is_equipment_property(name: &str) -> bool {
-    // List of known equipment property names in loadout files
-    const EQUIPMENT_PROPERTIES: [&str; 17] = [
-        "uniform", "vest", "backpack", "headgear", "goggles", "hmd",
-        "primaryweapon", "secondaryweapon", "handgunweapon", "sidearmweapon",
-        "scope", "bipod", "attachment", "silencer", "magazines", "items", "linkeditems",
-        // Add any other relevant equipment property names here
-    ];
-    
-    EQUIPMENT_PROPERTIES.iter().any(|&prop_name| name == prop_name)
+/// Look up an equipment property or array by name, ignoring case.
+/// Returns the canonical lowercase name so no per-property allocation is needed.
+fn equipment_property_name(name: &str) -> Option<&'static str> {
+    EQUIPMENT_PROPERTIES.iter()
+        .copied()
+        .find(|equipment| equipment.eq_ignore_ascii_case(name))
 }
 
 /// Parse a SQM file and extract class references
-pub fn parse_sqm(file_path: &Path) -> Result<Vec<ClassReference>> {
+pub fn parse_sqm(file_path: &Path, source: &SourceFile) -> Result<Vec<ClassReference>> {
     debug!("Starting SQM file parse: {}", file_path.display());
     
-    let content = fs::read_to_string(file_path)
-        .map_err(|e| anyhow!("Failed to read SQM file: {}", e))?;
+    // Mission files can be several megabytes; parse straight from the loaded buffer
+    let content = source.text();
     
     let classes = extract_class_dependencies(&content);
     
     let mut dependencies = Vec::new();
     for class in classes {
         dependencies.push(ClassReference {
-            class_name: class,
+            class_name: class.into(),
             reference_type: ReferenceType::Direct,
             context: format!("sqm:{}", file_path.display()),
             source_file: file_path.to_path_buf()
@@ -186,7 +266,19 @@ pub fn parse_sqm(file_path: &Path) -> Result<Vec<ClassReference>> {
 }
 
 /// Wrapper around the sqf-analyzer crate that converts its output to our format
-pub fn parse_sqf(file_path: &Path) -> Result<Vec<ClassReference>> {
+/// 
+/// `source` is only used for the equipment function prefilter. sqf-analyzer takes a
+/// path and reads the file itself, so files that pass the prefilter are read twice.
+/// That is a deliberate trade-off: most scripts never call an equipment function and
+/// are rejected after the first read, without being analyzed at all.
+pub fn parse_sqf(file_path: &Path, source: &SourceFile) -> Result<Vec<ClassReference>> {
+    // Most scripts never touch equipment; skip the full analysis unless one of the
+    // equipment functions appears somewhere in the file
+    if !sqf_equipment_matcher().is_match(source.bytes()) {
+        debug!("No equipment functions in SQF file, skipping: {}", file_path.display());
+        return Ok(Vec::new());
+    }
+    
     debug!("Starting SQF file parse using sqf-analyzer: {}", file_path.display());
     
     // First, run with equipment functions to get direct equipment references
@@ -196,10 +288,11 @@ pub fn parse_sqf(file_path: &Path) -> Result<Vec<ClassReference>> {
         full_paths: false,
         include_vars: false,
         equipment_only: false,
-        functions: Some("addItemToUniform,addItemToVest,addItemToBackpack,addItem,addWeapon,addWeaponItem,addMagazine,addMagazineCargo,addWeaponCargo,addItemCargo,forceAddUniform,addVest,addHeadgear,addGoggles,addBackpack,ace_arsenal_fnc_initBox".to_string()),
+        functions: Some(SQF_EQUIPMENT_FUNCTIONS.to_string()),
     };
     
-    // Use the sqf-analyzer crate to analyze the file for equipment
+    // Use the sqf-analyzer crate to analyze the file for equipment; it re-reads the file
+    // from `path`, as it has no way to take the contents already loaded above
     let mut items = analyze_sqf(&equipment_args)
         .map_err(|e| anyhow!("Failed to parse SQF file with sqf-analyzer (equipment mode): {:?}", e))?;
     
@@ -210,7 +303,7 @@ pub fn parse_sqf(file_path: &Path) -> Result<Vec<ClassReference>> {
         .map(|item| {
             let reference_type = ReferenceType::Direct;
             ClassReference {
-                class_name: item,
+                class_name: item.into(),
                 reference_type,
                 context: format!("sqf:equipment:{}", file_path.display()),
                 source_file: file_path.to_path_buf()
@@ -1,28 +1,227 @@
-use std::path::Path;
+use std::collections::HashMap;
+use std::panic::{self, AssertUnwindSafe};
+use std::path::{Path, PathBuf};
+use std::sync::{mpsc, Arc};
 
 use anyhow::{Result, anyhow};
-use log::{debug, info, warn};
-use rayon::prelude::*;
+use log::{debug, info, log_enabled, warn, Level};
 
-use crate::types::{MissionScannerConfig, MissionResults};
+use crate::types::{ClassReference, FileKind, MissionFileResults, MissionScannerConfig, MissionResults};
 use super::{collector, parser};
+use super::cache::ParseCache;
+use super::intern::ClassNameInterner;
 
-/// Scan a single mission directory with configuration
-pub async fn scan_mission(
+/// Missions with this many files or fewer are parsed on the calling thread,
+/// where spinning up a thread pool would cost more than it saves
+const PARALLEL_THRESHOLD: usize = 8;
+
+/// Parse a single mission file, returning no dependencies if parsing fails
+fn parse_mission_file(file: &Path, kind: FileKind, cache: Option<&ParseCache>) -> Vec<ClassReference> {
+    debug!("Processing file: {}", file.display());
+    let result = match cache {
+        Some(cache) => parser::parse_file_cached(file, kind, cache),
+        None => parser::parse_file_as(file, kind),
+    };
+    result.unwrap_or_default()
+}
+
+/// Parse a mission file like [`parse_mission_file`], turning a parser panic into an error
+fn parse_mission_file_unwinding<P>(parse: &P, file: &Path, kind: FileKind) -> Result<Vec<ClassReference>>
+where
+    P: Fn(&Path, FileKind) -> Vec<ClassReference>,
+{
+    panic::catch_unwind(AssertUnwindSafe(|| parse(file, kind))).map_err(|payload| {
+        let message = payload.downcast_ref::<&str>().copied()
+            .or_else(|| payload.downcast_ref::<String>().map(String::as_str))
+            .unwrap_or("unknown panic");
+        anyhow!("Parser panicked on {}: {}", file.display(), message)
+    })
+}
+
+/// Parser for [`scan_files_with`] that reads through `cache` when one is given
+fn file_parser(cache: Option<&ParseCache>) -> impl Fn(&Path, FileKind) -> Vec<ClassReference> + Send + Sync + 'static {
+    let cache = cache.cloned();
+    move |file, kind| parse_mission_file(file, kind, cache.as_ref())
+}
+
+/// Thread pool that mission files are parsed on
+enum ScanPool {
+    /// Rayon's global pool, which already has the requested number of threads
+    Global,
+    /// Pool built for a thread count the global pool doesn't have
+    Dedicated(rayon::ThreadPool),
+}
+
+impl ScanPool {
+    /// Pick a pool with `threads` threads.
+    /// 
+    /// The global pool already matches the default thread count, so reuse it rather
+    /// than spawning a fresh set of threads for every mission. A dedicated pool is only
+    /// built for other thread counts, or when called from a pool thread, where blocking
+    /// on results could starve the pool
+    fn new(threads: usize) -> Result<Self> {
+        if threads == rayon::current_num_threads() && rayon::current_thread_index().is_none() {
+            Ok(Self::Global)
+        } else {
+            Ok(Self::Dedicated(rayon::ThreadPoolBuilder::new()
+                .num_threads(threads)
+                .build()?))
+        }
+    }
+
+    /// Run a job on the pool without waiting for it
+    fn spawn<J>(&self, job: J)
+    where
+        J: FnOnce() + Send + 'static,
+    {
+        match self {
+            Self::Global => rayon::spawn(job),
+            Self::Dedicated(pool) => pool.spawn(job),
+        }
+    }
+
+    /// Run two closures on the pool, potentially in parallel, and wait for both
+    fn join<A, B, RA, RB>(&self, a: A, b: B) -> (RA, RB)
+    where
+        A: FnOnce() -> RA + Send,
+        B: FnOnce() -> RB + Send,
+        RA: Send,
+        RB: Send,
+    {
+        match self {
+            Self::Global => rayon::join(a, b),
+            Self::Dedicated(pool) => pool.join(a, b),
+        }
+    }
+}
+
+/// Parse mission files in parallel, passing each file's dependencies to `on_file`
+/// in input order as soon as they are available.
+/// 
+/// At most `2 * threads` files are in flight at once. Results that finish early wait
+/// in a small reorder buffer until every earlier file has been delivered, so memory
+/// stays bounded however many files are scanned and callers can stream results out.
+/// 
+/// Files that fail to parse yield no dependencies. A parser panic stops the scan and
+/// is returned as an error; files after it are not delivered. Likewise, an error from
+/// `on_file` stops the scan: no further files are submitted and the error is returned.
+pub fn scan_files<F>(
+    files: &[(PathBuf, FileKind)],
+    threads: usize,
+    cache: Option<&ParseCache>,
+    on_file: F
+) -> Result<()>
+where
+    F: FnMut(&Path, Vec<ClassReference>) -> Result<()>,
+{
+    scan_files_with(files, threads, None, file_parser(cache), on_file)
+}
+
+/// Implementation of [`scan_files`] with the per-file parser passed in.
+/// Runs on `pool` if given, otherwise picks one when the batch is parsed in parallel.
+fn scan_files_with<P, F>(
+    files: &[(PathBuf, FileKind)],
+    threads: usize,
+    pool: Option<&ScanPool>,
+    parse: P,
+    mut on_file: F
+) -> Result<()>
+where
+    P: Fn(&Path, FileKind) -> Vec<ClassReference> + Send + Sync + 'static,
+    F: FnMut(&Path, Vec<ClassReference>) -> Result<()>,
+{
+    if threads <= 1 || files.len() <= PARALLEL_THRESHOLD {
+        for (file, kind) in files {
+            on_file(file, parse_mission_file_unwinding(&parse, file, *kind)?)?;
+        }
+        return Ok(());
+    }
+    
+    let owned_pool;
+    let pool = match pool {
+        Some(pool) => pool,
+        None => {
+            owned_pool = ScanPool::new(threads)?;
+            &owned_pool
+        }
+    };
+    let window = threads * 2;
+    let parse = Arc::new(parse);
+    let (sender, receiver) = mpsc::channel();
+    
+    // Each job owns a sender; the original goes with the last job, so the channel
+    // closes, rather than hanging, if a job is ever lost without sending
+    let mut sender = Some(sender);
+    let mut submit = |index: usize| {
+        let (file, kind) = files[index].clone();
+        let parse = Arc::clone(&parse);
+        let sender = if index + 1 == files.len() { sender.take() } else { sender.clone() }
+            .expect("each file is submitted exactly once, in order");
+        let job = move || {
+            // Panics are caught here; rayon would otherwise abort the process
+            let result = parse_mission_file_unwinding(&*parse, &file, kind);
+            // The receiver only goes away once the scan has finished or failed
+            let _ = sender.send((index, result));
+        };
+        pool.spawn(job);
+    };
+    
+    let mut next_to_submit = 0;
+    let mut next_to_emit = 0;
+    let mut pending: HashMap<usize, Result<Vec<ClassReference>>> = HashMap::new();
+    
+    while next_to_submit < files.len().min(window) {
+        submit(next_to_submit);
+        next_to_submit += 1;
+    }
+    
+    while next_to_emit < files.len() {
+        let (index, result) = receiver.recv()
+            .map_err(|e| anyhow!("Scan worker stopped unexpectedly: {}", e))?;
+        pending.insert(index, result);
+        
+        // Deliver every result that is now contiguous, refilling the window as slots free up.
+        // A panic is only reported in its turn, so every file before it is still delivered.
+        // Returning early on any error stops submissions; jobs still in flight finish and
+        // their results are dropped with the receiver
+        while let Some(result) = pending.remove(&next_to_emit) {
+            on_file(&files[next_to_emit].0, result?)?;
+            next_to_emit += 1;
+            
+            if next_to_submit < files.len() {
+                submit(next_to_submit);
+                next_to_submit += 1;
+            }
+        }
+    }
+    
+    Ok(())
+}
+
+/// Scan a single mission directory, passing each file's dependencies to `on_file`
+/// as soon as they are available instead of collecting them.
+/// 
+/// Dependencies arrive in the same order [`scan_mission`] returns them: mission.sqm
+/// first, then SQF and CPP/HPP files in walk order. Returns the files that were scanned.
+/// An error from `on_file` stops the scan and is returned, as in [`scan_files`].
+pub fn scan_mission_streaming<F>(
     mission_dir: &Path,
     threads: usize,
-    config: &MissionScannerConfig
-) -> Result<MissionResults> {
+    config: &MissionScannerConfig,
+    mut on_file: F
+) -> Result<MissionFileResults>
+where
+    F: FnMut(&Path, Vec<ClassReference>) -> Result<()>,
+{
     info!("Scanning mission directory: {}", mission_dir.display());
     debug!("Using {} threads", threads);
     debug!("Configuration: {:?}", config);
     
-    // Verify mission directory exists and is readable
-    if !mission_dir.exists() {
-        return Err(anyhow!("Mission directory does not exist: {}", mission_dir.display()));
-    }
-    
+    // Verify mission directory exists and is readable, with a single open
     if let Err(e) = std::fs::read_dir(mission_dir) {
+        if e.kind() == std::io::ErrorKind::NotFound {
+            return Err(anyhow!("Mission directory does not exist: {}", mission_dir.display()));
+        }
         return Err(anyhow!("Mission directory is not readable: {} - {}", mission_dir.display(), e));
     }
     
@@ -33,78 +232,168 @@ pub async fn scan_mission(
         .to_string();
     
     // Find mission files
-    let sqm_file = collector::find_mission_file(mission_dir)?;
-    let sqf_files = collector::find_script_files(mission_dir, &config.file_extensions)?;
-    let cpp_files = collector::find_code_files(mission_dir, &config.file_extensions)?;
+    let sqm_file = collector::find_parseable_mission_file(mission_dir, config.max_file_size);
+    let cache = config.cache_dir.as_ref().map(ParseCache::new);
+    let parse = file_parser(cache.as_ref());
+    let pool = if threads > 1 { Some(ScanPool::new(threads)?) } else { None };
+    let walk = || collector::find_source_files(mission_dir, &config.file_extensions, config.max_file_size);
+    
+    // mission.sqm's path is known before walking, so with more than one thread parse it
+    // on the scan pool while the walk runs. It finishes before the batch below starts, so
+    // no more than `threads` files are ever parsed at once; with one thread it joins the
+    // batch instead
+    let (walked, sqm_deps) = match (&pool, &sqm_file) {
+        (Some(pool), Some(file)) => {
+            let (walked, sqm_deps) = pool.join(
+                walk,
+                || parse_mission_file_unwinding(&parse, file, FileKind::Sqm)
+            );
+            (walked, Some(sqm_deps))
+        }
+        _ => (walk(), None),
+    };
+    let (sqf_files, cpp_files) = walked?;
     
     if sqm_file.is_none() && sqf_files.is_empty() && cpp_files.is_empty() {
         warn!("No mission files found in {}", mission_dir.display());
-        return Ok(MissionResults {
-            mission_name,
-            mission_dir: mission_dir.to_path_buf(),
-            sqm_file: None,
-            sqf_files: Vec::new(),
-            cpp_files: Vec::new(),
-            class_dependencies: Vec::new(),
-        });
+    } else {
+        info!("Found mission files: {} SQM, {} SQF, {} CPP/HPP", 
+            if sqm_file.is_some() { 1 } else { 0 },
+            sqf_files.len(),
+            cpp_files.len());
     }
     
-    info!("Found mission files: {} SQM, {} SQF, {} CPP/HPP", 
-        if sqm_file.is_some() { 1 } else { 0 },
-        sqf_files.len(),
-        cpp_files.len());
-    
-    let mut dependencies = Vec::new();
-    
-    // Process mission.sqm if present
-    if let Some(sqm_file) = &sqm_file {
-        debug!("Processing mission.sqm: {}", sqm_file.display());
-        match parser::parse_file(sqm_file) {
-            Ok(mut deps) => {
-                debug!("Found {} dependencies in SQM file", deps.len());
-                dependencies.append(&mut deps);
-            },
-            Err(e) => warn!("Failed to parse SQM file {}: {}", sqm_file.display(), e),
+    // Deliver SQM dependencies ahead of SQF and CPP/HPP ones
+    let batch_sqm_file = match (sqm_deps, &sqm_file) {
+        (Some(deps), Some(file)) => {
+            on_file(file, deps?)?;
+            None
         }
-    }
-    
-    // Process SQF files in parallel
-    let sqf_deps: Vec<_> = sqf_files.par_iter()
-        .flat_map(|file| {
-            debug!("Processing SQF file: {}", file.display());
-            parser::parse_file(file).unwrap_or_default()
-        })
-        .collect();
-    dependencies.extend(sqf_deps);
-    
-    // Process CPP/HPP files in parallel
-    let cpp_deps: Vec<_> = cpp_files.par_iter()
-        .flat_map(|file| {
-            debug!("Processing CPP/HPP file: {}", file.display());
-            parser::parse_file(file).unwrap_or_default()
-        })
-        .collect();
-    dependencies.extend(cpp_deps);
+        _ => sqm_file.clone(),
+    };
     
-    debug!("Total of {} dependencies found for mission {}", 
-        dependencies.len(), mission_name);
-    
-    // Log unique class names found
-    let unique_classes: std::collections::HashSet<_> = dependencies.iter()
-        .map(|d| d.class_name.as_str())
+    // Parse the other files in one batch, keeping SQM, SQF, CPP/HPP input order
+    // Kinds are known from the directory walk, so no extension is re-parsed per file
+    let files: Vec<(PathBuf, FileKind)> = batch_sqm_file.into_iter().map(|file| (file, FileKind::Sqm))
+        .chain(sqf_files.iter().map(|file| (file.clone(), FileKind::Sqf)))
+        .chain(cpp_files.iter().map(|file| (file.clone(), FileKind::Code)))
         .collect();
+    scan_files_with(&files, threads, pool.as_ref(), parse, on_file)?;
     
-    debug!("Unique class names found in {}:", mission_name);
-    for class in &unique_classes {
-        debug!("  - {}", class);
-    }
-    
-    Ok(MissionResults {
+    Ok(MissionFileResults {
         mission_name,
         mission_dir: mission_dir.to_path_buf(),
         sqm_file,
         sqf_files,
         cpp_files,
-        class_dependencies: dependencies,
     })
-}
\ No newline at end of file
+}
+
+/// Scan a single mission directory with configuration
+pub async fn scan_mission(
+    mission_dir: &Path,
+    threads: usize,
+    config: &MissionScannerConfig
+) -> Result<MissionResults> {
+    let mission_dir = mission_dir.to_path_buf();
+    let config = config.clone();
+    
+    // Walking and parsing block, so keep them off the async executor
+    tokio::task::spawn_blocking(move || {
+        // Intern class names as each file's results arrive, so the per-file copies of
+        // names that were already seen are freed straight away
+        let mut interner = ClassNameInterner::new();
+        let mut dependencies = Vec::new();
+        let files = scan_mission_streaming(&mission_dir, threads, &config, |_, mut file_deps| {
+            interner.intern_references(&mut file_deps);
+            dependencies.append(&mut file_deps);
+            Ok(())
+        })?;
+        
+        debug!("Total of {} dependencies ({} unique classes) found for mission {}", 
+            dependencies.len(), interner.len(), files.mission_name);
+        
+        // Log unique class names found, only building the set when it will be printed
+        if log_enabled!(Level::Debug) {
+            let unique_classes: std::collections::HashSet<_> = dependencies.iter()
+                .map(|d| &*d.class_name)
+                .collect();
+            
+            debug!("Unique class names found in {}:", files.mission_name);
+            for class in &unique_classes {
+                debug!("  - {}", class);
+            }
+        }
+        
+        Ok(MissionResults {
+            mission_name: files.mission_name,
+            mission_dir: files.mission_dir,
+            sqm_file: files.sqm_file,
+            sqf_files: files.sqf_files,
+            cpp_files: files.cpp_files,
+            class_dependencies: dependencies,
+        })
+    }).await?
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn test_files(count: usize) -> Vec<(PathBuf, FileKind)> {
+        (0..count).map(|i| (PathBuf::from(format!("file_{}.sqf", i)), FileKind::Sqf)).collect()
+    }
+
+    fn panic_on_file_5(file: &Path, _kind: FileKind) -> Vec<ClassReference> {
+        if file == Path::new("file_5.sqf") {
+            panic!("parser bug");
+        }
+        Vec::new()
+    }
+
+    #[test]
+    fn test_scan_files_reports_parser_panic() {
+        let files = test_files(PARALLEL_THRESHOLD * 4);
+        let mut delivered = Vec::new();
+        let result = scan_files_with(&files, 4, None, panic_on_file_5, |file, _| {
+            delivered.push(file.to_path_buf());
+            Ok(())
+        });
+
+        let error = result.expect_err("Panic should be returned as an error").to_string();
+        assert!(error.contains("file_5.sqf") && error.contains("parser bug"), "{}", error);
+        assert_eq!(delivered, files[..5].iter().map(|(file, _)| file.clone()).collect::<Vec<_>>());
+    }
+
+    #[test]
+    fn test_scan_files_reports_parser_panic_sequentially() {
+        let files = test_files(PARALLEL_THRESHOLD);
+        let result = scan_files_with(&files, 1, None, panic_on_file_5, |_, _| Ok(()));
+        assert!(result.is_err(), "Panic should be returned as an error");
+    }
+
+    #[test]
+    fn test_scan_files_stops_on_callback_error() {
+        let files = test_files(PARALLEL_THRESHOLD * 8);
+        let parsed = Arc::new(std::sync::atomic::AtomicUsize::new(0));
+        let counter = Arc::clone(&parsed);
+        let parse = move |_: &Path, _: FileKind| {
+            counter.fetch_add(1, std::sync::atomic::Ordering::SeqCst);
+            Vec::new()
+        };
+
+        let mut delivered = 0;
+        let result = scan_files_with(&files, 4, None, parse, |_, _| {
+            delivered += 1;
+            if delivered == 3 {
+                return Err(anyhow!("output closed"));
+            }
+            Ok(())
+        });
+
+        assert_eq!(result.expect_err("Callback error should stop the scan").to_string(), "output closed");
+        assert_eq!(delivered, 3);
+        // Only the files already in the window when the callback failed are ever parsed
+        assert!(parsed.load(std::sync::atomic::Ordering::SeqCst) <= 3 + 4 * 2);
+    }
+}
@@ -0,0 +1,32 @@
+use std::borrow::Cow;
+use std::fs;
+use std::io;
+use std::path::Path;
+
+/// Raw contents of a mission file, loaded once and shared between the cache and parsers
+pub(crate) struct SourceFile {
+    bytes: Vec<u8>,
+}
+
+impl SourceFile {
+    /// Read a file into memory.
+    ///
+    /// Files are read rather than memory-mapped: the Arma editor rewrites mission.sqm
+    /// in place on save, and a mapped file truncated mid-scan would kill the process.
+    pub fn open(path: &Path) -> io::Result<Self> {
+        Ok(Self { bytes: fs::read(path)? })
+    }
+
+    /// Raw bytes of the file
+    pub fn bytes(&self) -> &[u8] {
+        &self.bytes
+    }
+
+    /// File contents as text, validated in place without copying.
+    ///
+    /// Mission files are often saved as Windows-1252 rather than UTF-8; invalid
+    /// sequences are replaced instead of failing the whole file.
+    pub fn text(&self) -> Cow<'_, str> {
+        String::from_utf8_lossy(self.bytes())
+    }
+}
@@ -1,9 +1,42 @@
 use std::path::PathBuf;
+use std::sync::Arc;
 use serde::{Serialize, Deserialize};
 
 /// Default file extensions to scan
 pub const DEFAULT_FILE_EXTENSIONS: &[&str] = &["sqm", "sqf", "cpp", "hpp"];
 
+/// Default size limit for files to scan (16 MiB)
+pub const DEFAULT_MAX_FILE_SIZE: u64 = 16 * 1024 * 1024;
+
+/// File extensions handled as CPP/HPP code files
+pub const CODE_FILE_EXTENSIONS: &[&str] = &["cpp", "hpp", "ext"];
+
+/// Kind of mission file, which decides the parser used for it
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Hash)]
+pub enum FileKind {
+    /// SQF script file
+    Sqf,
+    /// mission.sqm file
+    Sqm,
+    /// CPP/HPP/EXT config file
+    Code,
+}
+
+impl FileKind {
+    /// Determine the file kind from an extension (without the dot), ignoring case
+    pub fn from_extension(extension: &str) -> Option<Self> {
+        if extension.eq_ignore_ascii_case("sqf") {
+            Some(FileKind::Sqf)
+        } else if extension.eq_ignore_ascii_case("sqm") {
+            Some(FileKind::Sqm)
+        } else if CODE_FILE_EXTENSIONS.iter().any(|ext| extension.eq_ignore_ascii_case(ext)) {
+            Some(FileKind::Code)
+        } else {
+            None
+        }
+    }
+}
+
 /// Configuration for mission scanning
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct ScanConfig {
@@ -38,6 +71,16 @@ pub struct MissionScannerConfig {
     pub max_threads: usize,
     /// Extract only specific file extensions (empty = all)
     pub file_extensions: Vec<String>,
+    /// Directory for caching parse results between scans (None = caching disabled)
+    pub cache_dir: Option<PathBuf>,
+    /// Files larger than this many bytes are skipped
+    #[serde(default = "default_max_file_size")]
+    pub max_file_size: u64,
+}
+
+/// Serde default for configs saved before `max_file_size` existed
+fn default_max_file_size() -> u64 {
+    DEFAULT_MAX_FILE_SIZE
 }
 
 impl Default for MissionScannerConfig {
@@ -45,6 +88,8 @@ impl Default for MissionScannerConfig {
         Self {
             max_threads: num_cpus::get(),
             file_extensions: DEFAULT_FILE_EXTENSIONS.iter().map(|&s| s.to_string()).collect(),
+            cache_dir: None,
+            max_file_size: DEFAULT_MAX_FILE_SIZE,
         }
     }
 }
@@ -78,6 +123,11 @@ pub struct MissionResults {
     /// List of CPP/HPP files in the mission
     pub cpp_files: Vec<PathBuf>,
     /// List of class dependencies
+    /// 
+    /// CPP/HPP loadout references are deduplicated per file: an item listed many times
+    /// under the same property (e.g. `items[]` in several classes) yields one reference
+    /// per file, not one per occurrence. Inheritance references are deduplicated the
+    /// same way, per parent class.
     pub class_dependencies: Vec<ClassReference>,
 }
 
@@ -87,7 +137,13 @@ pub struct ClassReference {
     /// Name of the class
     /// Note: Arma 3 class names are case-insensitive. When comparing class names,
     /// they should be converted to lowercase first.
-    pub class_name: String,
+    /// Scans intern names, so references to the same class share one allocation.
+    /// 
+    /// Changed from `String` to `Arc<str>` in 0.2.0. Use `&*class_name` for a `&str`
+    /// and `.into()` to build one from a `String` or `&str`. This differs from
+    /// `parser_sqf::ClassReference`, which is a separate analysis type and still owns
+    /// a `String`.
+    pub class_name: Arc<str>,
     /// Type of reference
     pub reference_type: ReferenceType,
     /// Context where the class is referenced
@@ -1,9 +1,14 @@
 use std::path::PathBuf;
 use anyhow::Result;
 use log::debug;
+use tempfile::TempDir;
 
 use mission_scanner::{
+    parse_file,
+    scan_files,
     scan_mission,
+    scan_mission_streaming,
+    FileKind,
     MissionScannerConfig,
     ReferenceType,
 };
@@ -68,7 +73,7 @@ async fn test_mission_class_dependencies() -> Result<()> {
     
     // Get all class names from dependencies
     let found_classes: std::collections::HashSet<_> = result.class_dependencies.iter()
-        .map(|dep| dep.class_name.as_str())
+        .map(|dep| &*dep.class_name)
         .collect();
     
     println!("Found classes:");
@@ -139,4 +144,241 @@ async fn test_mission_class_dependencies() -> Result<()> {
     assert!(reference_types.contains(&ReferenceType::Variable), "Should find variable references");
     
     Ok(())
-} 
\ No newline at end of file
+}
+
+#[tokio::test]
+async fn test_scan_mission_with_cache() -> Result<()> {
+    init();
+    let test_dir = get_test_data_dir().join("test_mission_1");
+    let cache_dir = TempDir::new()?;
+    
+    let mut config = MissionScannerConfig::default();
+    config.cache_dir = Some(cache_dir.path().to_path_buf());
+    
+    // First scan populates the cache, second scan is served from it
+    let first = scan_mission(&test_dir, num_cpus::get(), &config).await?;
+    assert!(std::fs::read_dir(cache_dir.path())?.next().is_some(), "Cache should contain entries");
+    let second = scan_mission(&test_dir, num_cpus::get(), &config).await?;
+    
+    let first_classes: Vec<_> = first.class_dependencies.iter().map(|d| &d.class_name).collect();
+    let second_classes: Vec<_> = second.class_dependencies.iter().map(|d| &d.class_name).collect();
+    assert_eq!(first_classes, second_classes);
+    
+    Ok(())
+}
+
+#[tokio::test]
+async fn test_scan_mission_skips_oversized_files() -> Result<()> {
+    let test_dir = get_test_data_dir().join("test_mission_1");
+    
+    let mut config = MissionScannerConfig::default();
+    config.max_file_size = 0;
+    let result = scan_mission(&test_dir, num_cpus::get(), &config).await?;
+    
+    // Only the empty init scripts fit within the limit
+    assert!(result.sqm_file.is_none(), "mission.sqm should be skipped");
+    assert!(result.cpp_files.is_empty(), "CPP/HPP files should be skipped");
+    assert!(result.sqf_files.iter().all(|f| std::fs::metadata(f).unwrap().len() == 0));
+    
+    Ok(())
+}
+
+#[test]
+fn test_scan_files_preserves_input_order() -> Result<()> {
+    let test_dir = get_test_data_dir().join("test_mission_2").join("jebus");
+    let mut files: Vec<(PathBuf, FileKind)> = std::fs::read_dir(&test_dir)?
+        .map(|entry| entry.map(|e| e.path()))
+        .collect::<std::io::Result<Vec<_>>>()?
+        .into_iter()
+        .filter(|path| path.extension().map_or(false, |ext| ext == "sqf"))
+        .map(|path| (path, FileKind::Sqf))
+        .collect();
+    files.sort();
+    assert!(files.len() > 8, "Need enough files to exercise the parallel path");
+    
+    let mut delivered = Vec::new();
+    scan_files(&files, 4, None, |file, _| {
+        delivered.push(file.to_path_buf());
+        Ok(())
+    })?;
+    
+    let expected: Vec<_> = files.iter().map(|(path, _)| path.clone()).collect();
+    assert_eq!(delivered, expected);
+    
+    Ok(())
+}
+
+#[test]
+fn test_parse_file_without_classes() -> Result<()> {
+    let dir = TempDir::new()?;
+    let file = dir.path().join("settings.ext");
+    std::fs::write(&file, "enableDebugConsole = 1;\nrespawnDelay = 5;\n")?;
+    
+    let references = parse_file(&file)?;
+    assert!(references.is_empty(), "Files without classes should yield no references");
+    
+    Ok(())
+}
+
+#[tokio::test]
+async fn test_scan_mission_interns_class_names() -> Result<()> {
+    let test_dir = get_test_data_dir().join("test_mission_2");
+    let config = MissionScannerConfig::default();
+    let result = scan_mission(&test_dir, num_cpus::get(), &config).await?;
+    
+    // Every reference to a class should share the first reference's allocation
+    let mut first_seen: std::collections::HashMap<&str, &std::sync::Arc<str>> = std::collections::HashMap::new();
+    for dep in &result.class_dependencies {
+        let first = first_seen.entry(&*dep.class_name).or_insert(&dep.class_name);
+        assert!(std::sync::Arc::ptr_eq(first, &dep.class_name), "{} was not interned", dep.class_name);
+    }
+    
+    Ok(())
+}
+
+#[tokio::test]
+async fn test_scan_mission_streaming_matches_scan_mission() -> Result<()> {
+    let test_dir = get_test_data_dir().join("test_mission_2");
+    let config = MissionScannerConfig::default();
+    let result = scan_mission(&test_dir, num_cpus::get(), &config).await?;
+    
+    let mut streamed = Vec::new();
+    let files = scan_mission_streaming(&test_dir, num_cpus::get(), &config, |_, mut deps| {
+        streamed.append(&mut deps);
+        Ok(())
+    })?;
+    
+    assert_eq!(files.sqm_file, result.sqm_file);
+    assert_eq!(files.sqf_files, result.sqf_files);
+    assert_eq!(files.cpp_files, result.cpp_files);
+    
+    // Parsers return classes from hash sets, so only the file order is stable between
+    // scans; compare the references of each file as sorted multisets
+    let sorted_references = |deps: &[mission_scanner::ClassReference]| {
+        let mut references: Vec<_> = deps.iter()
+            .map(|d| (d.source_file.clone(), d.class_name.to_string()))
+            .collect();
+        references.sort();
+        references
+    };
+    assert_eq!(sorted_references(&streamed), sorted_references(&result.class_dependencies));
+    
+    Ok(())
+}
+
+#[test]
+fn test_parse_file_deduplicates_loadout_items() -> Result<()> {
+    let dir = TempDir::new()?;
+    let file = dir.path().join("loadout.hpp");
+    std::fs::write(&file, r#"
+        class baseMan {
+            uniform[] = {"U_B_CombatUniform_mcam"};
+            items[] = {"ItemMap", "ItemMap", "ACE_fieldDressing"};
+        };
+        class rifleman : baseMan {
+            uniform[] = {"U_B_CombatUniform_mcam"};
+            items[] = {"ItemMap", "ACE_fieldDressing"};
+        };
+        class medic : baseMan {
+            items[] = {"ACE_fieldDressing"};
+        };
+    "#)?;
+    
+    let references = parse_file(&file)?;
+    
+    // One reference per (property, item) pair and per parent, however often they repeat
+    let count = |name: &str, reference_type: ReferenceType| references.iter()
+        .filter(|r| &*r.class_name == name && r.reference_type == reference_type)
+        .count();
+    assert_eq!(count("baseMan", ReferenceType::Inheritance), 1);
+    assert_eq!(count("U_B_CombatUniform_mcam", ReferenceType::Direct), 1);
+    assert_eq!(count("ItemMap", ReferenceType::Direct), 1);
+    assert_eq!(count("ACE_fieldDressing", ReferenceType::Direct), 1);
+    assert_eq!(references.len(), 4);
+    
+    Ok(())
+}
+
+#[test]
+fn test_find_source_files_skips_binary_files() -> Result<()> {
+    let temp = TempDir::new()?;
+    let dir = temp.path();
+    
+    // Large file with a NUL byte well inside the first 4 KiB
+    let mut binary = vec![b'a'; 2 * 1024 * 1024];
+    binary[100] = 0;
+    std::fs::write(dir.join("binarized.sqf"), &binary)?;
+    
+    // Same size without NUL bytes, and a small script, are both kept
+    std::fs::write(dir.join("large.sqf"), vec![b'a'; 2 * 1024 * 1024])?;
+    std::fs::write(dir.join("init.sqf"), "player addItem \"ItemMap\";")?;
+    
+    let extensions = vec!["sqf".to_string()];
+    let (mut sqf_files, _) = mission_scanner::scanner::find_source_files(dir, &extensions, u64::MAX)?;
+    
+    sqf_files.sort();
+    assert_eq!(sqf_files, vec![dir.join("init.sqf"), dir.join("large.sqf")]);
+    
+    Ok(())
+}
+
+#[test]
+fn test_config_without_new_fields_deserializes() -> Result<()> {
+    // Config saved before cache_dir and max_file_size were added
+    let config: MissionScannerConfig = serde_json::from_str(r#"{"max_threads": 2, "file_extensions": ["sqf"]}"#)?;
+    
+    assert_eq!(config.max_threads, 2);
+    assert_eq!(config.cache_dir, None);
+    assert_eq!(config.max_file_size, mission_scanner::types::DEFAULT_MAX_FILE_SIZE);
+    
+    Ok(())
+}
+
+#[tokio::test]
+async fn test_scan_mission_skips_rapified_mission_file() -> Result<()> {
+    let temp = TempDir::new()?;
+    let mission_dir = temp.path().join("rapified.Altis");
+    std::fs::create_dir(&mission_dir)?;
+    
+    // Binarized mission.sqm files are small and start with the "\0raP" signature
+    let mut rapified = b"\0raP".to_vec();
+    rapified.extend_from_slice(&[0, 0, 0, 0, 8, 0, 0, 0]);
+    rapified.extend_from_slice(b"version\0");
+    std::fs::write(mission_dir.join("mission.sqm"), &rapified)?;
+    std::fs::write(mission_dir.join("init.sqf"), "player addItem \"ItemMap\";")?;
+    
+    let config = MissionScannerConfig::default();
+    let result = scan_mission(&mission_dir, num_cpus::get(), &config).await?;
+    
+    assert!(result.sqm_file.is_none(), "Rapified mission.sqm should be skipped");
+    assert_eq!(result.sqf_files, vec![mission_dir.join("init.sqf")]);
+    
+    Ok(())
+}
+
+#[test]
+fn test_file_finders_match_find_source_files() -> Result<()> {
+    use mission_scanner::scanner::{find_code_files, find_script_files, find_source_files};
+    
+    let temp = TempDir::new()?;
+    let dir = temp.path();
+    for name in ["init.sqf", "Loadout.SQF", "mission.sqm", "gear.hpp", "description.ext"] {
+        std::fs::write(dir.join(name), "")?;
+    }
+    
+    let extensions: Vec<String> = ["sqm", "sqf", "hpp", "ext"].iter().map(|ext| ext.to_string()).collect();
+    let (mut sqf_files, mut code_files) = find_source_files(dir, &extensions, u64::MAX)?;
+    let mut script_files = find_script_files(dir, &extensions)?;
+    let mut found_code_files = find_code_files(dir, &extensions)?;
+    for files in [&mut sqf_files, &mut code_files, &mut script_files, &mut found_code_files] {
+        files.sort();
+    }
+    
+    // Extensions match case-insensitively, and code files never include scripts or mission.sqm
+    assert_eq!(script_files, vec![dir.join("Loadout.SQF"), dir.join("init.sqf")]);
+    assert_eq!(found_code_files, vec![dir.join("description.ext"), dir.join("gear.hpp")]);
+    assert_eq!(script_files, sqf_files);
+    assert_eq!(found_code_files, code_files);
+    
+    Ok(())
+}